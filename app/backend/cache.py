@@ -0,0 +1,373 @@
+# cache.py
+import os
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from functools import lru_cache
+from pydantic import TypeAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache settings (all optional, loaded from .env like the DB credentials)
+# 'redis' also needs the redis package, which is not in requirements.txt: pip install redis
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "sqlite")  # sqlite | redis | none
+CACHE_PATH = os.environ.get(
+    "CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "results.sqlite3")
+)
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 256 * 1024 * 1024))
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 24 * 60 * 60))  # seconds
+CACHE_LOCK_TTL = int(os.environ.get("CACHE_LOCK_TTL", 120))  # seconds
+WATERMARK_TTL = int(os.environ.get("WATERMARK_TTL", 10))  # seconds, see crud.get_data_watermark
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+# Bump this when the shape of cached values changes so old entries are ignored
+CACHE_SCHEMA_VERSION = "2"
+
+# Returned by _load() on a miss, so a cached None is still a hit
+_MISS = object()
+
+
+def file_hash(path: str) -> str:
+    """
+    Returns a short sha256 of a file's contents, or 'none' if it is missing.
+    """
+    if not os.path.exists(path):
+        return "none"
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def make_key(namespace: str, *parts, watermark: str, model_hash: str | None = None) -> str:
+    """
+    Builds a versioned cache key. Entries written before a model change or
+    before new data arrived simply stop matching and age out via eviction.
+    """
+    fields = [f"v{CACHE_SCHEMA_VERSION}", namespace, f"wm={watermark}"]
+    if model_hash is not None:
+        fields.append(f"model={model_hash}")
+    fields.extend(str(p) for p in parts)
+    return ":".join(fields)
+
+
+@lru_cache(maxsize=None)
+def _adapter(value_type) -> TypeAdapter:
+    return TypeAdapter(value_type)
+
+
+class CacheBackend:
+    """
+    Minimal interface every backend implements. Values are opaque bytes;
+    get_or_compute() takes care of (de)serialization and stampede protection.
+    """
+
+    def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        """Atomically takes the lock for 'key' unless another process holds it."""
+        raise NotImplementedError
+
+    def release_lock(self, key: str, owner: str) -> None:
+        raise NotImplementedError
+
+    def get_or_compute(self, key: str, compute, value_type, ttl: float = CACHE_TTL,
+                       lock_ttl: float = CACHE_LOCK_TTL, poll_interval: float = 0.1):
+        """
+        Returns the cached value for 'key', or calls compute() and stores it.
+        Values are stored as JSON and validated back into 'value_type'
+        (e.g. list[schemas.Demanda]), never unpickled.
+
+        Only one process computes a missing key at a time; the others wait
+        for its result instead of all hitting the database / model at once.
+        This blocks, so call it from plain 'def' endpoints (threadpool).
+        If the cache store itself is failing, compute() is called directly.
+        """
+        adapter = _adapter(value_type)
+        cached = self._load(key, adapter)
+        if cached is not _MISS:
+            return cached
+
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + lock_ttl
+        while True:
+            try:
+                if self.acquire_lock(key, owner, lock_ttl):
+                    break
+            except Exception as e:
+                print(f"Cache lock failed for {key}, computing without cache: {e}")
+                return compute()
+            time.sleep(poll_interval)
+            cached = self._load(key, adapter)
+            if cached is not _MISS:
+                return cached
+            if time.monotonic() > deadline:
+                # The holder is stuck or died; compute ourselves rather than fail
+                return compute()
+
+        try:
+            # Another process may have filled it while we were acquiring
+            cached = self._load(key, adapter)
+            if cached is not _MISS:
+                return cached
+            value = compute()
+            self._store(key, value, adapter, ttl)
+            return value
+        finally:
+            try:
+                self.release_lock(key, owner)
+            except Exception as e:
+                # The lock expires on its own after lock_ttl
+                print(f"Cache unlock failed for {key}: {e}")
+
+    def _load(self, key: str, adapter: TypeAdapter):
+        try:
+            raw = self.get(key)
+        except Exception as e:
+            print(f"Cache read failed for {key}: {e}")
+            return _MISS
+        if raw is None:
+            return _MISS
+        try:
+            return adapter.validate_json(raw)
+        except Exception as e:
+            print(f"Cache entry for {key} is unreadable, ignoring: {e}")
+            return _MISS
+
+    def _store(self, key: str, value, adapter: TypeAdapter, ttl: float) -> None:
+        try:
+            self.set(key, adapter.dump_json(value), ttl)
+        except Exception as e:
+            print(f"Cache write failed for {key}: {e}")
+
+
+class NullCache(CacheBackend):
+    """
+    Disables caching: every call goes straight to compute().
+    """
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def acquire_lock(self, key, owner, ttl):
+        return True
+
+    def release_lock(self, key, owner):
+        pass
+
+
+class SQLiteCache(CacheBackend):
+    """
+    On-disk cache shared by every worker process on the host.
+    Entries are evicted least-recently-used once the total payload size
+    exceeds 'max_bytes'; locks live in their own table so they work
+    across processes.
+    """
+
+    # Hits refresh 'accessed_at' at most this often, so most reads stay read-only
+    TOUCH_INTERVAL = 60  # seconds
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not be shared across a fork, so reopen per process
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+            if (hasattr(os, "getuid") and os.path.exists(self.path)
+                    and os.stat(self.path).st_uid != os.getuid()):
+                raise PermissionError(f"Refusing cache file not owned by this user: {self.path}")
+            conn = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS locks ("
+                " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            # Running payload total, so set() never has to SUM the whole table
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (name, value)"
+                " SELECT 'total_size', COALESCE(SUM(size), 0) FROM entries"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                # Expired rows are cleaned up by the next set()
+                return None
+            if now - row[2] > self.TOUCH_INTERVAL:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now + ttl, now),
+                )
+                self._add_to_total(conn, len(value) - (old[0] if old else 0))
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _add_to_total(self, conn: sqlite3.Connection, delta: int) -> None:
+        conn.execute("UPDATE meta SET value = value + ? WHERE name = 'total_size'", (delta,))
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._connection().execute(
+                "SELECT value FROM meta WHERE name = 'total_size'"
+            ).fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries WHERE expires_at < ?", (now,)
+        ).fetchone()[0]
+        if expired:
+            conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,))
+            self._add_to_total(conn, -expired)
+
+        total = conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until we are back under the limit
+        excess = total - self.max_bytes
+        victims = []
+        freed = 0
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at ASC"
+        ):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self._add_to_total(conn, -freed)
+
+    def acquire_lock(self, key, owner, ttl):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM locks WHERE key = ? AND expires_at < ?", (key, now))
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO locks (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (key, owner, now + ttl),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return cursor.rowcount == 1
+
+    def release_lock(self, key, owner):
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM locks WHERE key = ? AND owner = ?", (key, owner)
+            )
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache backed by any Redis-compatible server (Redis, Valkey, KeyDB...).
+    Size bounding is delegated to the server, so run it with a
+    'maxmemory' limit and 'maxmemory-policy allkeys-lru'.
+    """
+
+    LOCK_PREFIX = "lock:"
+
+    # Compare-and-delete in one step, so we never drop a lock someone else retook
+    RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) end return 0"
+    )
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCache":
+        try:
+            import redis  # optional dependency, only needed for this backend
+        except ImportError as e:
+            raise ImportError(
+                "CACHE_BACKEND=redis needs the 'redis' package: pip install redis"
+            ) from e
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, px=int(ttl * 1000))
+
+    def acquire_lock(self, key, owner, ttl):
+        return bool(
+            self.client.set(self.LOCK_PREFIX + key, owner, nx=True, px=int(ttl * 1000))
+        )
+
+    def release_lock(self, key, owner):
+        self.client.eval(self.RELEASE_SCRIPT, 1, self.LOCK_PREFIX + key, owner)
+
+
+def create_cache() -> CacheBackend:
+    if CACHE_BACKEND == "none":
+        return NullCache()
+    if CACHE_BACKEND == "redis":
+        return RedisCache.from_url(REDIS_URL)
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCache(CACHE_PATH, CACHE_MAX_BYTES)
+    raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+
+
+# Shared instance used by the routers
+cache = create_cache()
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import select, func # <--- MODIFIED: Added func
 from datetime import date, timedelta, datetime as dt
 import models, schemas
+from cache import cache, WATERMARK_TTL
 import pandas as pd
 
 # --- Sequia ---
@@ -173,3 +174,32 @@ def get_historical_data_for_prediction(db: Session, start_datetime: dt) -> pd.Da
     print(merged_df.info())
     
     return merged_df[['demanda', 'sequia', 'drought_day']]
+
+# +++ DATA WATERMARKS FOR CACHE KEYS +++
+def _get_table_watermark(db: Session, date_column) -> str:
+    query = select(func.max(date_column), func.count()).select_from(date_column.table)
+    latest, rows = db.execute(query).one()
+    return f"{latest}|{rows}"
+
+def get_data_watermark(db: Session, *date_columns) -> str:
+    """
+    Returns a string that changes when rows are inserted into or deleted from
+    the tables owning 'date_columns' (e.g. models.Demanda.fecha_hora).
+    Each table's MAX/COUNT is itself kept in the shared cache for
+    WATERMARK_TTL seconds, so cache hits do not touch the database and new
+    data shows up within that window. In-place UPDATEs are NOT detected;
+    those are only picked up once CACHE_TTL expires.
+    """
+    parts = [
+        cache.get_or_compute(
+            f"watermark:{column.table.name}",
+            lambda column=column: _get_table_watermark(db, column),
+            str,
+            ttl=WATERMARK_TTL,
+        )
+        for column in date_columns
+    ]
+    # Hand the connection back to the pool: callers may now wait on another
+    # worker's cache lock, and should not hold a connection while doing so
+    db.rollback()
+    return ":".join(parts)
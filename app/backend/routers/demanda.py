@@ -2,8 +2,10 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session 
 from datetime import date
-import crud, schemas
+from decimal import Decimal
+import crud, schemas, models
 from database import get_db
+from cache import cache, make_key
 
 router = APIRouter(
     prefix="/demanda",
@@ -11,7 +13,7 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=list[schemas.Demanda])
-async def read_demanda( 
+def read_demanda( 
     start_date: date,
     num_days: int = Query(..., gt=0, description="Number of days to go back (must be > 0)"),
     db: Session = Depends(get_db) 
@@ -20,17 +22,27 @@ async def read_demanda(
     Get Demanda (demand) data for a date range.
     Handles the TIMESTAMP field based on the input DATE.
     """
-    demanda_data = crud.get_demanda_data(db=db, start_date=start_date, num_days=num_days) 
+    watermark = crud.get_data_watermark(db, models.Demanda.fecha_hora)
+    key = make_key("demanda", start_date, num_days, watermark=watermark)
+    demanda_data = cache.get_or_compute(key, lambda: [
+        schemas.Demanda.model_validate(row)
+        for row in crud.get_demanda_data(db=db, start_date=start_date, num_days=num_days)
+    ], list[schemas.Demanda])
     return demanda_data
 
 # +++ ADD NEW ENDPOINT FOR TOTAL DEMANDA +++
 @router.get("/total", response_model=schemas.TotalDemanda)
-async def read_total_demanda(
+def read_total_demanda(
     target_date: date = Query(..., description="The specific date to get the total for"),
     db: Session = Depends(get_db)
 ):
     """
     Get the total 'demanda' for a single specific date by summing all 30-min intervals.
     """
-    total = crud.get_total_demanda_for_date(db=db, target_date=target_date)
+    watermark = crud.get_data_watermark(db, models.Demanda.fecha_hora)
+    key = make_key("demanda-total", target_date, watermark=watermark)
+    total = cache.get_or_compute(
+        key, lambda: Decimal(crud.get_total_demanda_for_date(db=db, target_date=target_date)),
+        Decimal
+    )
     return {"fecha": target_date, "total_demanda": total}
\ No newline at end of file
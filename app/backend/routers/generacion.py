@@ -2,8 +2,10 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session 
 from datetime import date
-import crud, schemas
+from decimal import Decimal
+import crud, schemas, models
 from database import get_db
+from cache import cache, make_key
 
 router = APIRouter(
     prefix="/generacion",
@@ -11,7 +13,7 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=list[schemas.Generacion])
-async def read_generacion( 
+def read_generacion( 
     start_date: date,
     num_days: int = Query(..., gt=0, description="Number of days to go back (must be > 0)"),
     empresa: str | None = Query(None, description="Optional: Filter by a specific empresa"),
@@ -20,19 +22,29 @@ async def read_generacion(
     """
     Get Generacion (generation) data for a date range, with an optional filter by empresa.
     """
-    generacion_data = crud.get_generacion_data( 
-        db=db, start_date=start_date, num_days=num_days, empresa=empresa
-    )
+    watermark = crud.get_data_watermark(db, models.Generacion.fecha)
+    key = make_key("generacion", start_date, num_days, empresa, watermark=watermark)
+    generacion_data = cache.get_or_compute(key, lambda: [
+        schemas.Generacion.model_validate(row)
+        for row in crud.get_generacion_data(
+            db=db, start_date=start_date, num_days=num_days, empresa=empresa
+        )
+    ], list[schemas.Generacion])
     return generacion_data
 
 # +++ ADD NEW ENDPOINT FOR TOTAL GENERACION +++
 @router.get("/total", response_model=schemas.TotalGeneracion)
-async def read_total_generacion(
+def read_total_generacion(
     target_date: date = Query(..., description="The specific date to get the total for"),
     db: Session = Depends(get_db)
 ):
     """
     Get the total 'generacion' for a single specific date.
     """
-    total = crud.get_total_generacion_for_date(db=db, target_date=target_date)
+    watermark = crud.get_data_watermark(db, models.Generacion.fecha)
+    key = make_key("generacion-total", target_date, watermark=watermark)
+    total = cache.get_or_compute(
+        key, lambda: Decimal(crud.get_total_generacion_for_date(db=db, target_date=target_date)),
+        Decimal
+    )
     return {"fecha": target_date, "total_generacion": total}
\ No newline at end of file
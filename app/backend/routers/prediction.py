@@ -4,7 +4,9 @@ from datetime import date, datetime, timedelta
 import random
 import schemas
 import crud 
+import models
 from database import get_db
+from cache import cache, make_key, file_hash
 
 # --- IMPORTS FOR ML MODEL ---
 import pandas as pd
@@ -27,6 +29,9 @@ else:
     model = xgb.Booster()
     model.load_model(MODEL_PATH)
 
+# Cached forecasts are tied to the exact model file they were produced with
+MODEL_HASH = file_hash(MODEL_PATH)
+
 FEATURE_COLUMNS = [
     'drought', 'year', 'month', 'day', 'hour', 'sin_time', 'cos_time',
     'weekday', 'drought_day', 'lag_1', 'lag_24', 'lag_168',
@@ -82,7 +87,7 @@ def create_features(df: pd.DataFrame) -> pd.DataFrame:
     return df_feat
 
 @router.get("/demanda", response_model=list[schemas.DemandaPrediction])
-async def predict_demanda(
+def predict_demanda(
     start_datetime: datetime = Query(..., description="Mandatory start datetime for the prediction (YYYY-MM-DDTHH:MM:SS)."),
     db: Session = Depends(get_db)
 ):
@@ -95,6 +100,20 @@ async def predict_demanda(
             detail=f"Model not loaded. Check server logs. Missing: {MODEL_PATH}"
         )
 
+    # The forecast reads both demanda and sequia history
+    watermark = crud.get_data_watermark(db, models.Demanda.fecha_hora, models.Sequia.fecha)
+    key = make_key(
+        "predict-demanda", start_datetime.isoformat(),
+        watermark=watermark, model_hash=MODEL_HASH
+    )
+    return cache.get_or_compute(
+        key, lambda: forecast_demanda(db, start_datetime), list[schemas.DemandaPrediction]
+    )
+
+def forecast_demanda(db: Session, start_datetime: datetime) -> list[schemas.DemandaPrediction]:
+    """
+    Runs the recursive 30-day forecast. Expensive, so callers go through the cache.
+    """
     hist_df = crud.get_historical_data_for_prediction(db, start_datetime)
     
     if hist_df.empty:
@@ -2,8 +2,9 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session # <-- Changed from AsyncSession
 from datetime import date
-import crud, schemas
+import crud, schemas, models
 from database import get_db
+from cache import cache, make_key
 
 router = APIRouter(
     prefix="/sequia",
@@ -11,7 +12,7 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=list[schemas.Sequia])
-async def read_sequia( # <-- This stays async
+def read_sequia(
     start_date: date,
     num_days: int = Query(..., gt=0, description="Number of days to go back (must be > 0)"),
     db: Session = Depends(get_db) # <-- Changed from AsyncSession
@@ -21,5 +22,10 @@ async def read_sequia( # <-- This stays async
     """
     # We call the synchronous crud function directly.
     # FastAPI is smart enough to run this in a threadpool.
-    sequia_data = crud.get_sequia_data(db=db, start_date=start_date, num_days=num_days) # <-- await removed
+    watermark = crud.get_data_watermark(db, models.Sequia.fecha)
+    key = make_key("sequia", start_date, num_days, watermark=watermark)
+    sequia_data = cache.get_or_compute(key, lambda: [
+        schemas.Sequia.model_validate(row)
+        for row in crud.get_sequia_data(db=db, start_date=start_date, num_days=num_days)
+    ], list[schemas.Sequia])
     return sequia_data
\ No newline at end of file
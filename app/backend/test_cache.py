@@ -0,0 +1,167 @@
+# test_cache.py
+import os
+import time
+import multiprocessing
+from decimal import Decimal
+
+from cache import SQLiteCache, RedisCache, make_key
+
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands RedisCache uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.px = {}
+
+    def _alive(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self.data[key]
+            return None
+        return value
+
+    def get(self, key):
+        return self._alive(key)
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and self._alive(key) is not None:
+            return None
+        self.px[key] = px
+        expires_at = time.monotonic() + px / 1000 if px is not None else None
+        self.data[key] = (value.encode() if isinstance(value, str) else value, expires_at)
+        return True
+
+    def eval(self, script, numkeys, key, owner):
+        assert script == RedisCache.RELEASE_SCRIPT and numkeys == 1
+        if self._alive(key) == owner.encode():
+            del self.data[key]
+            return 1
+        return 0
+
+
+def _count_calls(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return len(f.read())
+
+
+def _slow_compute(db_path: str, calls_path: str):
+    """Runs in a worker process; records each compute() in 'calls_path'."""
+    def compute():
+        with open(calls_path, "a") as f:
+            f.write("x")
+        time.sleep(0.5)
+        return [1, 2, 3]
+    return SQLiteCache(db_path, 1024 * 1024).get_or_compute("k", compute, list[int])
+
+
+def test_eviction_keeps_payload_under_max_bytes(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite3"), max_bytes=1000)
+    for i in range(20):
+        cache.set(f"k{i}", b"x" * 200, ttl=60)
+
+    stored = cache._connection().execute("SELECT SUM(size) FROM entries").fetchone()[0]
+    assert stored <= 1000
+    assert cache.total_size() == stored
+    # Most recently written entries survive, oldest are gone
+    assert cache.get("k19") is not None
+    assert cache.get("k0") is None
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite3"), max_bytes=1000)
+    cache.set("k", b"1", ttl=-1)
+    assert cache.get("k") is None
+
+    calls = []
+    assert cache.get_or_compute("k", lambda: calls.append(1) or 5, int) == 5
+    assert calls == [1]
+
+
+def test_cached_none_is_a_hit(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite3"), max_bytes=1000)
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute("k", lambda: calls.append(1), int | None) is None
+    assert calls == [1]
+
+
+def test_values_round_trip_as_json(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite3"), max_bytes=1000)
+    cache.get_or_compute("k", lambda: Decimal("12.50"), Decimal)
+    assert cache.get("k") == b'"12.50"'
+    assert cache.get_or_compute("k", lambda: Decimal("0"), Decimal) == Decimal("12.50")
+
+
+def test_keys_change_with_watermark_and_model_hash():
+    base = make_key("predict", "2024-01-01", watermark="w1", model_hash="m1")
+    assert base == make_key("predict", "2024-01-01", watermark="w1", model_hash="m1")
+    assert base != make_key("predict", "2024-01-01", watermark="w2", model_hash="m1")
+    assert base != make_key("predict", "2024-01-01", watermark="w1", model_hash="m2")
+
+
+def test_single_compute_under_multiprocess_contention(tmp_path):
+    db_path = str(tmp_path / "c.sqlite3")
+    calls_path = str(tmp_path / "calls")
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        results = pool.starmap(_slow_compute, [(db_path, calls_path)] * 4)
+
+    assert results == [[1, 2, 3]] * 4
+    assert _count_calls(calls_path) == 1
+
+
+def test_falls_back_when_lock_holder_dies(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite3"), max_bytes=1000)
+    # A "dead" holder whose lock expires on its own
+    assert cache.acquire_lock("k", "dead-owner", ttl=0.2)
+    assert cache.get_or_compute("k", lambda: 7, int, poll_interval=0.05) == 7
+    assert cache.get("k") == b"7"
+
+    # A stuck holder that never lets go: waiters give up after lock_ttl
+    assert cache.acquire_lock("j", "stuck-owner", ttl=60)
+    value = cache.get_or_compute("j", lambda: 8, int, lock_ttl=0.2, poll_interval=0.05)
+    assert value == 8
+
+
+def test_broken_store_still_computes(tmp_path):
+    # The parent "directory" is a regular file, so the database can never open
+    (tmp_path / "not-a-dir").write_text("")
+    cache = SQLiteCache(str(tmp_path / "not-a-dir" / "x.sqlite3"), max_bytes=1000)
+    assert cache.get_or_compute("k", lambda: 5, int) == 5
+
+
+def test_redis_lock_has_a_single_owner_and_expires():
+    client = FakeRedis()
+    cache = RedisCache(client)
+
+    assert cache.acquire_lock("k", "a", ttl=0.2)
+    assert client.px["lock:k"] == 200
+    assert not cache.acquire_lock("k", "b", ttl=0.2)
+
+    # A non-owner release leaves the lock in place
+    cache.release_lock("k", "b")
+    assert not cache.acquire_lock("k", "b", ttl=0.2)
+
+    # After expiry someone else can take it, and the old owner can't drop it
+    time.sleep(0.25)
+    assert cache.acquire_lock("k", "b", ttl=60)
+    cache.release_lock("k", "a")
+    assert not cache.acquire_lock("k", "c", ttl=60)
+
+    cache.release_lock("k", "b")
+    assert cache.acquire_lock("k", "c", ttl=60)
+
+
+def test_redis_get_or_compute_round_trip():
+    client = FakeRedis()
+    cache = RedisCache(client)
+    calls = []
+    for _ in range(2):
+        value = cache.get_or_compute("k", lambda: calls.append(1) or [1, 2], list[int], ttl=30)
+        assert value == [1, 2]
+    assert calls == [1]
+    assert client.px["k"] == 30000
+    # The lock was released after computing
+    assert client.get("lock:k") is None